@@ -1,76 +1,536 @@
-from agno.agent import Agent
-from agno.models.groq import Groq
-from agno.playground import Playground, serve_playground_app
-from agno.storage.sqlite import SqliteStorage
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.tools.yfinance import YFinanceTools
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import lru_cache
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+import asyncio
+import logging
 import os
+import threading
+import time
+import traceback
 
-# Usar ruta absoluta para la base de datos
-agent_storage: str = "/app/tmp/agents.db"
-
-
-web_agent = Agent(
-    name="Web Agent",
-    model=Groq(
-        id="llama3-70b-8192",
-        api_key="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",
-    ),
-    tools=[DuckDuckGoTools()],
-    instructions=["Always include sources"],
-    storage=SqliteStorage(table_name="web_agent", db_file=agent_storage),
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    num_history_responses=5,
-    markdown=True,
+# Usar ruta absoluta para la base de datos. Si hay tmpfs (/dev/shm) se usa para evitar fsync a disco:
+# el historial de chat no sobrevive a un reinicio del contenedor, lo cual es aceptable para estos datos
+agent_storage: str = os.environ.get(
+    "AGENT_DB_PATH", "/dev/shm/agents.db" if os.path.isdir("/dev/shm") else "/app/tmp/agents.db"
 )
 
+# API key de Groq: se lee una sola vez y falla al importar si no está configurada
+_GROQ_KEY: str = os.environ["GROQ_API_KEY"]
 
+# El directorio de trabajo no cambia tras el arranque
+_CWD: str = os.getcwd()
 
-finance_agent = Agent(
-    name="William Cabrera",
-    model=Groq(
-        id="llama3-70b-8192",
-        api_key="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",
-    ),
-    tools=[YFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True, company_news=True)],
-    instructions=["Always use tables to display data"],
-    storage=SqliteStorage(table_name="finance_agent", db_file=agent_storage),
-    add_datetime_to_instructions=True,
-    add_history_to_messages=True,
-    num_history_responses=5,
-    markdown=True,
+# Incluir el traceback completo en los errores de /debug/db solo si se pide explícitamente
+DEBUG_VERBOSE: bool = os.environ.get("DEBUG_VERBOSE") == "1"
+
+# PRAGMAs para SQLite: WAL permite lecturas concurrentes con las escrituras de los agentes
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Tamaño del pool de conexiones compartido por ambos agentes
+SQLITE_POOL_SIZE: int = 8
+
+# Modelo de Groq usado por ambos agentes
+GROQ_MODEL_ID: str = "llama3-70b-8192"
+
+# Instrucciones fijas de cada agente (agno acepta un str directamente, sin lista intermedia)
+WEB_INSTRUCTIONS: str = "Always include sources"
+FINANCE_INSTRUCTIONS: str = "Always use tables to display data"
+
+# Máximo de peticiones aceptadas por /batch
+BATCH_MAX_ITEMS: int = 8
+
+
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def create_storage_engine(db_file: str):
+    """Engine con pool acotado; los PRAGMAs se aplican una vez por conexión abierta."""
+    if db_file == ":memory:":
+        # Una sola conexión compartida: con el pool por hilo cada hilo vería su propia base vacía
+        return create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+    # AGENT_DB_PATH puede ser un nombre de archivo sin directorio (se crea en el directorio actual)
+    if os.path.dirname(db_file):
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    engine = create_engine(
+        f"sqlite:///{db_file}",
+        poolclass=QueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=0,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+storage_engine = create_storage_engine(agent_storage)
+
+
+# Un único hilo escritor: serializa las escrituras a SQLite (un solo escritor, incluso en WAL)
+# y las saca del event loop. Las lecturas siguen siendo directas.
+_WRITER_STATE = threading.local()
+
+
+def _mark_writer_thread():
+    _WRITER_STATE.is_writer = True
+
+
+_WRITE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="sqlite-writer", initializer=_mark_writer_thread
+)
+# session_id -> future de su última escritura; se modifica desde los hilos de petición y desde los
+# callbacks del hilo escritor, siempre con _PENDING_LOCK
+_PENDING_WRITES: dict = {}
+_PENDING_LOCK = threading.Lock()
+# La espera de read() a la escritura pendiente solo cubre este proceso: con varios workers el siguiente
+# turno puede llegar a otro, así que upsert() espera a que la fila esté confirmada
+_WAIT_FOR_WRITES: bool = int(os.environ.get("WEB_CONCURRENCY", 1)) > 1
+
+
+def _drain_writes():
+    """Espera a todas las escrituras encoladas (el escritor es FIFO y de un solo hilo)."""
+    if _PENDING_WRITES and not getattr(_WRITER_STATE, "is_writer", False):
+        _WRITE_EXECUTOR.submit(lambda: None).result()
+
+
+@lru_cache(maxsize=1)
+def _queued_storage_class():
+    from agno.storage.sqlite import SqliteStorage
+    from agno.utils.log import logger
+
+    class QueuedSqliteStorage(SqliteStorage):
+        """SqliteStorage cuyas escrituras se ejecutan en _WRITE_EXECUTOR.
+
+        upsert() devuelve una copia de la sesión sin esperar a la escritura (salvo con varios workers
+        de Uvicorn, ver _WAIT_FOR_WRITES); read() y delete_session()
+        esperan a la escritura pendiente de esa sesión, y los listados a todas las pendientes, para no
+        leer datos viejos.
+        """
+
+        def upsert(self, session, create_and_retry: bool = True):
+            # Reintento interno de agno (crea la tabla y vuelve a llamar a upsert) desde el hilo escritor
+            if getattr(_WRITER_STATE, "is_writer", False):
+                return super().upsert(session, create_and_retry)
+            # Copia: el agente sigue modificando su memoria mientras el hilo escritor serializa.
+            # deepcopy conserva tipos (datetime, tuplas, objetos en session_state) que un JSON no
+            snapshot = deepcopy(session)
+            session_id = snapshot.session_id
+            with _PENDING_LOCK:
+                future = _WRITE_EXECUTOR.submit(super().upsert, snapshot, create_and_retry)
+                _PENDING_WRITES[session_id] = future
+
+            def _done(f):
+                # Solo se retira si sigue siendo la última: un upsert posterior pudo haberla sustituido
+                with _PENDING_LOCK:
+                    if _PENDING_WRITES.get(session_id) is f:
+                        del _PENDING_WRITES[session_id]
+                if f.exception() is not None:
+                    logger.error(f"Error al guardar la sesión {session_id}: {f.exception()}")
+
+            future.add_done_callback(_done)
+            if _WAIT_FOR_WRITES:
+                future.result()
+            return snapshot
+
+        def read(self, session_id: str, user_id=None):
+            # upsert() de agno relee la sesión desde el propio hilo escritor: ahí no hay que esperar
+            with _PENDING_LOCK:
+                pending = _PENDING_WRITES.get(session_id)
+            if pending is not None and not getattr(_WRITER_STATE, "is_writer", False):
+                pending.exception()
+            return super().read(session_id, user_id)
+
+        def delete_session(self, session_id=None):
+            _WRITE_EXECUTOR.submit(super().delete_session, session_id).result()
+
+        def get_all_session_ids(self, user_id=None, entity_id=None):
+            _drain_writes()
+            return super().get_all_session_ids(user_id, entity_id)
+
+        def get_all_sessions(self, user_id=None, entity_id=None):
+            _drain_writes()
+            return super().get_all_sessions(user_id, entity_id)
+
+    return QueuedSqliteStorage
+
+
+def pooled_storage(table_name: str):
+    """Storage de agno sobre storage_engine con escrituras en segundo plano.
+
+    SqliteStorage descarta db_engine y abre una base en memoria, por eso se reasigna el engine tras construirlo.
+    """
+    storage = _queued_storage_class()(table_name=table_name, db_engine=storage_engine)
+    storage.db_engine = storage_engine
+    storage.inspector = inspect(storage_engine)
+    storage.SqlSession = sessionmaker(bind=storage_engine)
+    return storage
+
+
+@lru_cache(maxsize=1)
+def get_groq_clients():
+    """Clientes de Groq compartidos: un solo pool de conexiones a api.groq.com para ambos agentes."""
+    import httpx
+    from groq import AsyncGroq, Groq as GroqClient
+
+    limits = httpx.Limits(max_keepalive_connections=20)
+    return (
+        GroqClient(api_key=_GROQ_KEY, http_client=httpx.Client(limits=limits)),
+        AsyncGroq(api_key=_GROQ_KEY, http_client=httpx.AsyncClient(limits=limits)),
+    )
+
+
+def groq_model():
+    # Cada agente necesita su propio Groq (guarda herramientas y funciones), pero comparten los clientes HTTP
+    from agno.models.groq import Groq
+
+    client, async_client = get_groq_clients()
+    return Groq(id=GROQ_MODEL_ID, client=client, async_client=async_client)
+
+
+@lru_cache(maxsize=1)
+def get_yfinance_session():
+    """Sesión HTTP compartida por todas las consultas de yfinance (reutiliza conexiones a Yahoo Finance)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+    return session
+
+
+def _make_agent(name: str, tools: list, instructions: str, table: str):
+    """Configuración común de los agentes: modelo, storage compartido e historial."""
+    from agno.agent import Agent
+
+    return Agent(
+        name=name,
+        model=groq_model(),
+        tools=tools,
+        instructions=instructions,
+        storage=pooled_storage(table),
+        add_datetime_to_instructions=True,
+        add_history_to_messages=True,
+        num_history_responses=5,
+        markdown=True,
+    )
+
+
+# Los agentes se construyen bajo demanda: importar agno y sus herramientas es costoso
+@lru_cache(maxsize=1)
+def get_web_agent():
+    from agno.tools.duckduckgo import DuckDuckGoTools
+
+    return _make_agent("Web Agent", [DuckDuckGoTools()], WEB_INSTRUCTIONS, "web_agent")
+
+
+# Campos de .info que get_company_info copia tal cual (mismo orden y etiquetas que agno)
+_COMPANY_INFO_FIELDS = (
+    ("Sector", "sector"), ("Industry", "industry"), ("Address", "address1"), ("City", "city"),
+    ("State", "state"), ("Zip", "zip"), ("Country", "country"), ("EPS", "trailingEps"),
+    ("P/E Ratio", "trailingPE"), ("52 Week Low", "fiftyTwoWeekLow"), ("52 Week High", "fiftyTwoWeekHigh"),
+    ("50 Day Average", "fiftyDayAverage"), ("200 Day Average", "twoHundredDayAverage"),
+    ("Website", "website"), ("Summary", "longBusinessSummary"),
+    ("Analyst Recommendation", "recommendationKey"), ("Number Of Analyst Opinions", "numberOfAnalystOpinions"),
+    ("Employees", "fullTimeEmployees"), ("Total Cash", "totalCash"), ("Free Cash flow", "freeCashflow"),
+    ("Operating Cash flow", "operatingCashflow"), ("EBITDA", "ebitda"), ("Revenue Growth", "revenueGrowth"),
+    ("Gross Margins", "grossMargins"), ("Ebitda Margins", "ebitdaMargins"),
 )
 
 
+@lru_cache(maxsize=1)
+def _session_yfinance_tools_class():
+    """YFinanceTools cuyas herramientas crean yf.Ticker con la sesión compartida.
 
-app = Playground(agents=[web_agent, finance_agent]).get_app()
+    Las de agno llaman a yf.Ticker(symbol) sin sesión y yfinance abre una conexión nueva cada vez.
+    Se sobrescriben solo las herramientas que usa el agente financiero, con los mismos textos y formatos.
+    """
+    import json
+
+    import yfinance
+    from agno.tools.yfinance import YFinanceTools
+
+    class SessionYFinanceTools(YFinanceTools):
+        @staticmethod
+        def _ticker(symbol: str):
+            return yfinance.Ticker(symbol, session=get_yfinance_session())
+
+        def get_current_stock_price(self, symbol: str) -> str:
+            """Use this function to get the current stock price for a given symbol.
+
+            Args:
+                symbol (str): The stock symbol.
+
+            Returns:
+                str: The current stock price or error message.
+            """
+            try:
+                info = self._ticker(symbol).info
+                current_price = info.get("regularMarketPrice", info.get("currentPrice"))
+                return f"{current_price:.4f}" if current_price else f"Could not fetch current price for {symbol}"
+            except Exception as e:
+                return f"Error fetching current price for {symbol}: {e}"
+
+        def get_company_info(self, symbol: str) -> str:
+            """Use this function to get company information and overview for a given stock symbol.
+
+            Args:
+                symbol (str): The stock symbol.
+
+            Returns:
+                str: JSON containing company profile and overview.
+            """
+            try:
+                info = self._ticker(symbol).info
+                if info is None:
+                    return f"Could not fetch company info for {symbol}"
+                currency = info.get("currency", "USD")
+                company_info = {
+                    "Name": info.get("shortName"),
+                    "Symbol": info.get("symbol"),
+                    "Current Stock Price": f"{info.get('regularMarketPrice', info.get('currentPrice'))} {currency}",
+                    "Market Cap": f"{info.get('marketCap', info.get('enterpriseValue'))} {currency}",
+                }
+                company_info.update((label, info.get(key)) for label, key in _COMPANY_INFO_FIELDS)
+                return json.dumps(company_info, indent=2)
+            except Exception as e:
+                return f"Error fetching company profile for {symbol}: {e}"
+
+        def get_analyst_recommendations(self, symbol: str) -> str:
+            """Use this function to get analyst recommendations for a given stock symbol.
+
+            Args:
+                symbol (str): The stock symbol.
+
+            Returns:
+                str: JSON containing analyst recommendations.
+            """
+            try:
+                return self._ticker(symbol).recommendations.to_json(orient="index")
+            except Exception as e:
+                return f"Error fetching analyst recommendations for {symbol}: {e}"
+
+        def get_company_news(self, symbol: str, num_stories: int = 3) -> str:
+            """Use this function to get company news and press releases for a given stock symbol.
+
+            Args:
+                symbol (str): The stock symbol.
+                num_stories (int): The number of news stories to return. Defaults to 3.
+
+            Returns:
+                str: JSON containing company news and press releases.
+            """
+            try:
+                return json.dumps(self._ticker(symbol).news[:num_stories], indent=2)
+            except Exception as e:
+                return f"Error fetching company news for {symbol}: {e}"
+
+    return SessionYFinanceTools
+
+
+@lru_cache(maxsize=1)
+def get_finance_agent():
+    SessionYFinanceTools = _session_yfinance_tools_class()
+
+    return _make_agent(
+        "William Cabrera",
+        [SessionYFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True, company_news=True)],
+        FINANCE_INSTRUCTIONS,
+        "finance_agent",
+    )
+
+
+def create_session_indexes():
+    """Crear las tablas y el índice del listado de sesiones (WHERE user_id = ? ORDER BY created_at DESC)."""
+    for agent in (get_web_agent(), get_finance_agent()):
+        agent.storage.create()
+        table = agent.storage.table_name
+        with storage_engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_user_created ON {table}(user_id, created_at DESC)"
+            ))
+
+
+@lru_cache(maxsize=1)
+def get_playground_app() -> FastAPI:
+    from agno.playground import Playground
+
+    return Playground(agents=[get_web_agent(), get_finance_agent()]).get_app()
+
+
+class NonStreamingGZipMiddleware(GZipMiddleware):
+    """GZip excepto en las rutas /runs: responden en streaming y comprimirlas retendría los tokens."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/runs"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app = FastAPI(title="agent-playground", default_response_class=ORJSONResponse)
+# Las tablas markdown y los resultados de búsqueda comprimen bien; /health queda por debajo del umbral
+app.add_middleware(NonStreamingGZipMiddleware, minimum_size=1024, compresslevel=4)
+
+
+# Construir el Playground en segundo plano para que /health responda desde el arranque
+@app.on_event("startup")
+async def mount_playground():
+    async def _mount():
+        playground_app = await run_in_threadpool(get_playground_app)
+        await run_in_threadpool(create_session_indexes)
+        # Índice por nombre y agent_id (el Playground asigna los agent_id al construir sus rutas)
+        app.state.agents = {
+            key: agent
+            for agent in (get_web_agent(), get_finance_agent())
+            for key in (agent.name, agent.agent_id)
+        }
+        app.mount("/", playground_app)
+
+    def _report_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            exc = task.exception()
+            logging.getLogger("uvicorn.error").error(
+                "No se pudo montar el Playground: %s", exc, exc_info=(type(exc), exc, exc.__traceback__)
+            )
+
+    app.state.playground_task = asyncio.create_task(_mount())
+    app.state.playground_task.add_done_callback(_report_failure)
+
+
+# Vaciar la cola de escritura y cerrar las conexiones del pool al apagar la aplicación
+@app.on_event("shutdown")
+async def close_storage_pool():
+    # Terminar las escrituras pendientes antes de cerrar las conexiones
+    _WRITE_EXECUTOR.shutdown(wait=True)
+    storage_engine.dispose()
+
+
+# Respuesta de /health serializada una sola vez
+_HEALTH_BYTES = b'{"status":"healthy","service":"agent-playground"}'
 
 
 # Add health check endpoint
 @app.get("/health")
 async def health_check():
-    return JSONResponse(
-        status_code=200,
-        content={"status": "healthy", "service": "agent-playground"}
-    )
+    # Si el montaje del Playground falló, sus rutas no existen: el servicio no está sano
+    task = getattr(app.state, "playground_task", None)
+    if task is not None and task.done() and not task.cancelled() and task.exception() is not None:
+        return ORJSONResponse(
+            {"status": "unhealthy", "service": "agent-playground", "error": str(task.exception())},
+            status_code=503,
+        )
+    return Response(content=_HEALTH_BYTES, media_type="application/json", status_code=200)
+
+
+# Cache de (exists, size) de la base de datos para no hacer stat() en cada petición
+DB_STAT_TTL: float = 1.0
+_DB_STAT_CACHE = {"t": 0.0, "val": None}
+
+
+async def _db_stat(db_path: str):
+    now = time.monotonic()
+    if _DB_STAT_CACHE["val"] is not None and now - _DB_STAT_CACHE["t"] < DB_STAT_TTL:
+        return _DB_STAT_CACHE["val"]
+    # stat() en el threadpool: no bloquear el event loop si el disco está ocupado con escrituras
+    try:
+        val = (True, (await run_in_threadpool(os.stat, db_path)).st_size)
+    except FileNotFoundError:
+        val = (False, 0)
+    _DB_STAT_CACHE["t"] = now
+    _DB_STAT_CACHE["val"] = val
+    return val
 
 
 # Endpoint temporal para depuración de la base de datos con logs detallados
 @app.get("/debug/db")
 async def debug_db():
-    import traceback
-    db_path = "/app/tmp/agents.db"
     try:
-        exists = os.path.exists(db_path)
-        size = os.path.getsize(db_path) if exists else 0
-        return JSONResponse({"db_exists": exists, "db_size": size, "cwd": os.getcwd()})
+        exists, size = await _db_stat(agent_storage)
+        return ORJSONResponse({"db_exists": exists, "db_size": size, "cwd": _CWD})
     except Exception as e:
-        return JSONResponse({"error": str(e), "trace": traceback.format_exc(), "cwd": os.getcwd()}, status_code=500)
+        trace = traceback.format_exc() if DEBUG_VERBOSE else f"{type(e).__name__}: {e}"
+        return ORJSONResponse({"error": str(e), "trace": trace, "cwd": _CWD}, status_code=500)
+
+
+# Estado del pool de conexiones SQLite
+@app.get("/debug/pool")
+async def debug_pool():
+    pool = storage_engine.pool
+    if not isinstance(pool, QueuePool):
+        return ORJSONResponse({"pool": type(pool).__name__})
+    return ORJSONResponse({
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    })
+
+
+
+class BatchItem(BaseModel):
+    agent: str
+    prompt: str
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+# Ejecutar varias peticiones a los agentes en paralelo en una sola llamada HTTP
+@app.post("/batch")
+async def batch(items: List[BatchItem]):
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"Máximo {BATCH_MAX_ITEMS} peticiones por lote")
+
+    # Esperar a que el Playground termine de construir los agentes sin bloquear el event loop
+    await asyncio.shield(app.state.playground_task)
+
+    agents = []
+    for item in items:
+        agent = app.state.agents.get(item.agent)
+        if agent is None:
+            raise HTTPException(status_code=404, detail=f"Agent not found: {item.agent}")
+        agents.append(agent)
+
+    # Cada petición usa su propia copia del agente: arun() guarda estado en la instancia
+    responses = await asyncio.gather(*(
+        agent.deep_copy().arun(item.prompt, stream=False, session_id=item.session_id, user_id=item.user_id)
+        for agent, item in zip(agents, items)
+    ))
+    return ORJSONResponse([
+        {"agent": agent.name, "session_id": response.session_id, "content": response.content}
+        for agent, response in zip(agents, responses)
+    ])
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.environ.get("PORT", 7777))
-    serve_playground_app("playground:app", reload=False, port=port, host="0.0.0.0")
\ No newline at end of file
+    uvicorn.run(
+        "playground:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+    )
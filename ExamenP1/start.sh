@@ -43,6 +43,9 @@ echo "🌟 Starting backend Uvicorn server on port ${PORT:-7777}..."
 python -m uvicorn playground:app \
     --host 0.0.0.0 \
     --port ${PORT:-7777} \
+    --loop uvloop \
+    --http httptools \
+    --workers ${WEB_CONCURRENCY:-1} \
     --log-level info \
     --access-log \
     --timeout-keep-alive 5 \
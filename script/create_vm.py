@@ -11,95 +11,213 @@ Fecha: 2025-06-06
 """
 
 import os
+import re
 import sys
+import copy
 import json
 import logging
 import argparse
-import getpass
-from datetime import datetime
-from typing import Dict, Optional, Any
+import time
+import threading
+from datetime import datetime, timezone
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple, Any
 from pathlib import Path
 
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.mgmt.compute.models import DiskCreateOption
-from azure.core.exceptions import AzureError
+__version__ = "2.0.0"
+
+# Los SDK de Azure (incluido azure.core) se importan al crear el primer AzureVMCreator, así
+# --help, --generate-config, el menú y --dry-run arrancan sin cargarlos
+if TYPE_CHECKING:
+    from azure.core.polling import LROPoller
+
+_LAZY_AZURE_NAMES = frozenset({'AzureError'})
+
+
+def _lazy_azure() -> None:
+    """Importar los nombres de azure.core que usan los métodos de AzureVMCreator"""
+    global AzureError
+    from azure.core.exceptions import AzureError
+
+
+def __getattr__(name: str) -> Any:
+    """Resolver bajo demanda los nombres de Azure del módulo (p. ej. create_vm.AzureError)"""
+    if name in _LAZY_AZURE_NAMES:
+        _lazy_azure()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; se usa json de la biblioteca estándar
+    orjson = None
+
+
+def _loads(data: bytes) -> Any:
+    """Decodificar JSON con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_pretty(obj: Any) -> bytes:
+    """Serializar JSON indentado a 2 espacios en UTF-8 (valores no JSON como str)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str)
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=str).encode('utf-8')
 
 # Configuración de logging
-def setup_logging(log_level: str = "INFO") -> logging.Logger:
-    """Configurar el sistema de logging (solo consola para producción minimalista)"""
+@lru_cache(maxsize=1)
+def _build_logger() -> logging.Logger:
+    """Instalar el handler de consola una sola vez (solo consola para producción minimalista)"""
     logger = logging.getLogger("azure_vm_creator")
-    logger.setLevel(getattr(logging, log_level.upper()))
     
-    if not logger.handlers:
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(console_handler)
+    if logger.handlers:
+        return logger
+    
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.INFO)
+    
+    # Formatter
+    formatter = logging.Formatter(
+        '{asctime} - {name} - {levelname} - {message}', style='{'
+    )
+    console_handler.setFormatter(formatter)
+    
+    logger.addHandler(console_handler)
+    # Los registros ya se escriben aquí; no reenviarlos al logger raíz
+    logger.propagate = False
     
     return logger
 
 
+def setup_logging(log_level: str = "INFO") -> logging.Logger:
+    """Configurar el sistema de logging; el nivel se aplica en cada llamada"""
+    logger = _build_logger()
+    logger.setLevel(getattr(logging, log_level.upper()))
+    return logger
+
+
+# Nombres de VM válidos en Azure: 1-64 caracteres alfanuméricos, guiones o guiones bajos
+_VM_NAME_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+# Política de contraseñas de Azure para VMs Linux: 8-72 caracteres y al menos 3 de las
+# 4 clases (minúsculas, mayúsculas, dígitos, símbolos)
+_PASSWORD_POLICY_RE = re.compile(
+    r'(?=.{8,72}\Z)'
+    r'(?:(?=.*[a-z])(?=.*[A-Z])(?=.*\d)'
+    r'|(?=.*[a-z])(?=.*[A-Z])(?=.*[^A-Za-z0-9])'
+    r'|(?=.*[a-z])(?=.*\d)(?=.*[^A-Za-z0-9])'
+    r'|(?=.*[A-Z])(?=.*\d)(?=.*[^A-Za-z0-9]))',
+    re.DOTALL
+)
+
+# Campos comunes de las reglas SSH del NSG y regla final de denegación
+_SSH_RULE_TEMPLATE = {
+    'protocol': 'Tcp',
+    'source_port_range': '*',
+    'destination_address_prefix': '*',
+    'access': 'Allow',
+    'direction': 'Inbound'
+}
+_DENY_ALL_INBOUND_RULE = {
+    'name': 'DenyAllInbound',
+    'protocol': '*',
+    'source_port_range': '*',
+    'destination_port_range': '*',
+    'source_address_prefix': '*',
+    'destination_address_prefix': '*',
+    'access': 'Deny',
+    'priority': 4096,
+    'direction': 'Inbound'
+}
+
+# Configuración por defecto, construida una sola vez al importar el módulo
+_DEFAULT_CONFIG: Dict[str, Any] = {
+    'vm_name': 'azure-vm-prod',
+    'resource_group': 'rg-azure-vm',
+    'location': 'East US',
+    'vm_size': 'Standard_B2s',
+    'admin_username': 'azureuser',
+    'os_type': 'linux',
+    'image': {
+        'publisher': 'Canonical',
+        'offer': '0001-com-ubuntu-server-focal',
+        'sku': '20_04-lts-gen2',
+        'version': 'latest'
+    },
+    'network': {
+        'vnet_name': 'vnet-azure-vm',
+        'vnet_address_space': '10.0.0.0/16',
+        'subnet_name': 'subnet-default',
+        'subnet_address_prefix': '10.0.0.0/24',
+        'public_ip_name': 'ip-azure-vm',
+        'nsg_name': 'nsg-azure-vm',
+        'nic_name': 'nic-azure-vm'
+    },
+    'disk': {
+        'os_disk_size_gb': 30,
+        'storage_account_type': 'Premium_LRS'
+    },
+    'security': {
+        'ssh_port': 22,
+        'allowed_ssh_sources': ['*']
+    },
+    'tags': {
+        'Environment': 'Production',
+        'CreatedBy': 'AzureVMCreator',
+        'Project': 'Infrastructure'
+    }
+}
+
+
+_REQUIRED_FIELDS = ('vm_name', 'resource_group', 'location', 'admin_username')
+
+
+@lru_cache(maxsize=8)
+def _validate_cached(scalars: frozenset) -> Optional[str]:
+    """Validar los campos escalares de la configuración; devuelve el mensaje de error o None"""
+    values = dict(scalars)
+    
+    for field in _REQUIRED_FIELDS:
+        if not values.get(field):
+            return f"Campo requerido faltante: {field}"
+    
+    # Validar nombre de VM (Azure naming conventions)
+    if not _VM_NAME_RE.fullmatch(values['vm_name']):
+        return "Nombre de VM inválido. Debe tener 1-64 caracteres alfanuméricos, guiones o guiones bajos."
+    
+    return None
+
+
+def _validate_password(admin_password: Optional[str]) -> Optional[str]:
+    """Validar la contraseña antes de crear recursos (Azure la rechaza al crear la VM).
+    
+    Sin caché a propósito: la contraseña no debe quedar retenida como clave de lru_cache.
+    """
+    if admin_password and not _PASSWORD_POLICY_RE.match(admin_password):
+        return "Contraseña inválida. Debe tener 8-72 caracteres y al menos 3 de: minúsculas, mayúsculas, dígitos y símbolos."
+    return None
+
+
 class VMConfig:
     """Clase para manejar la configuración de la VM"""
     
     def __init__(self, config_file: Optional[str] = None):
         self.logger = logging.getLogger("azure_vm_creator.config")
         self.config = self._load_config(config_file) if config_file else self._default_config()
+        # Valores escalares (sin contraseña) de la última configuración validada con éxito
+        self._validated_items: Optional[frozenset] = None
     
     def _default_config(self) -> Dict[str, Any]:
-        """Configuración por defecto"""
-        return {
-            'vm_name': 'azure-vm-prod',
-            'resource_group': 'rg-azure-vm',
-            'location': 'East US',
-            'vm_size': 'Standard_B2s',
-            'admin_username': 'azureuser',
-            'os_type': 'linux',
-            'image': {
-                'publisher': 'Canonical',
-                'offer': '0001-com-ubuntu-server-focal',
-                'sku': '20_04-lts-gen2',
-                'version': 'latest'
-            },
-            'network': {
-                'vnet_name': 'vnet-azure-vm',
-                'vnet_address_space': '10.0.0.0/16',
-                'subnet_name': 'subnet-default',
-                'subnet_address_prefix': '10.0.0.0/24',
-                'public_ip_name': 'ip-azure-vm',
-                'nsg_name': 'nsg-azure-vm',
-                'nic_name': 'nic-azure-vm'
-            },
-            'disk': {
-                'os_disk_size_gb': 30,
-                'storage_account_type': 'Premium_LRS'
-            },
-            'security': {
-                'ssh_port': 22,
-                'allowed_ssh_sources': ['*']
-            },
-            'tags': {
-                'Environment': 'Production',
-                'CreatedBy': 'AzureVMCreator',
-                'Project': 'Infrastructure'
-            }
-        }
+        """Configuración por defecto (copia independiente de _DEFAULT_CONFIG)"""
+        return copy.deepcopy(_DEFAULT_CONFIG)
     
     def _load_config(self, config_file: str) -> Dict[str, Any]:
         """Cargar configuración desde archivo JSON"""
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            config = _loads(Path(config_file).read_bytes())
             self.logger.info(f"Configuración cargada desde {config_file}")
             return config
         except FileNotFoundError:
@@ -109,67 +227,196 @@ class VMConfig:
             self.logger.error(f"Error al parsear JSON: {e}")
             raise
     
+    def _scalar_items(self) -> frozenset:
+        """Valores escalares de primer nivel que intervienen en la validación cacheada (sin la contraseña)"""
+        return frozenset(
+            (key, value) for key, value in self.config.items()
+            if key != 'admin_password' and isinstance(value, (str, int, float, bool, type(None)))
+        )
+    
     def validate(self) -> bool:
-        """Validar la configuración"""
-        required_fields = ['vm_name', 'resource_group', 'location', 'admin_username']
+        """Validar la configuración (inmediato si no cambió desde la última validación correcta)"""
+        scalars = self._scalar_items()
+        # Igualdad del frozenset, no solo del hash: una colisión no puede dar por válida otra configuración
+        unchanged = scalars == self._validated_items
         
-        for field in required_fields:
-            if not self.config.get(field):
-                self.logger.error(f"Campo requerido faltante: {field}")
-                return False
-        
-        # Validar nombre de VM (Azure naming conventions)
-        vm_name = self.config['vm_name']
-        if not (1 <= len(vm_name) <= 64 and vm_name.replace('-', '').replace('_', '').isalnum()):
-            self.logger.error("Nombre de VM inválido. Debe tener 1-64 caracteres alfanuméricos, guiones o guiones bajos.")
+        error = None if unchanged else _validate_cached(scalars)
+        # La contraseña no forma parte de ninguna caché: se comprueba en cada llamada
+        error = error or _validate_password(self.config.get('admin_password'))
+        if error:
+            self.logger.error(error)
             return False
         
-        self.logger.info("Configuración validada exitosamente")
+        if not unchanged:
+            self._validated_items = scalars
+            self.logger.info("Configuración validada exitosamente")
         return True
     
     def get(self, key: str, default: Any = None) -> Any:
         """Obtener valor de configuración"""
         return self.config.get(key, default)
+    
+    # Secciones de la configuración, resueltas una sola vez por instancia
+    @cached_property
+    def network(self) -> Dict[str, Any]:
+        return self.config.get('network', {})
+    
+    @cached_property
+    def disk(self) -> Dict[str, Any]:
+        return self.config.get('disk', {})
+    
+    @cached_property
+    def image(self) -> Dict[str, Any]:
+        return self.config.get('image', {})
+    
+    @cached_property
+    def security(self) -> Dict[str, Any]:
+        return self.config.get('security', {})
+    
+    @cached_property
+    def tags(self) -> Dict[str, str]:
+        return self.config.get('tags', {})
+
+
+# Endpoint de Azure Resource Manager y versiones de API usadas en las lecturas por lotes
+ARM_ENDPOINT = "https://management.azure.com"
+ARM_BATCH_API_VERSION = "2020-06-01"
+COMPUTE_API_VERSION = "2023-03-01"
+NETWORK_API_VERSION = "2023-04-01"
+
+
+class CachingTokenCredential:
+    """Envoltorio de credencial que reutiliza cada token por scopes hasta 5 minutos antes de expirar"""
+    
+    REFRESH_MARGIN = 300
+    
+    def __init__(self, inner: Any):
+        self._inner = inner
+        self._cache: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+    
+    def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        """Devolver el token en caché o pedir uno nuevo a la credencial subyacente"""
+        key = scopes + tuple(sorted(kwargs.items()))
+        with self._lock:
+            token = self._cache.get(key)
+            if token is None or token.expires_on - time.time() < self.REFRESH_MARGIN:
+                token = self._inner.get_token(*scopes, **kwargs)
+                self._cache[key] = token
+            return token
+    
+    def close(self) -> None:
+        """Cerrar la credencial subyacente"""
+        self._inner.close()
+
+
+# Orígenes de DefaultAzureCredential que se pueden desactivar con AZURE_CREDENTIAL_EXCLUDE
+# (lista separada por comas, p. ej. "environment,managed_identity")
+_CREDENTIAL_SOURCES = (
+    'environment', 'workload_identity', 'managed_identity',
+    'shared_token_cache', 'cli', 'developer_cli'
+)
+
+
+@lru_cache(maxsize=1)
+def _get_credential() -> CachingTokenCredential:
+    """Credencial única por proceso para que todos los clientes compartan la caché de tokens"""
+    from azure.identity import DefaultAzureCredential
+    
+    excluded = {
+        source.strip() for source in os.getenv('AZURE_CREDENTIAL_EXCLUDE', '').split(',') if source.strip()
+    }
+    unknown = excluded.difference(_CREDENTIAL_SOURCES)
+    if unknown:
+        logging.getLogger("azure_vm_creator.main").warning(
+            f"Orígenes de credencial desconocidos en AZURE_CREDENTIAL_EXCLUDE: {', '.join(sorted(unknown))}"
+        )
+    
+    # Navegador, VS Code y PowerShell nunca se usan en este script: se excluyen siempre
+    options = {f'exclude_{source}_credential': source in excluded for source in _CREDENTIAL_SOURCES}
+    return CachingTokenCredential(DefaultAzureCredential(
+        exclude_interactive_browser_credential=True,
+        exclude_visual_studio_code_credential=True,
+        exclude_powershell_credential=True,
+        **options
+    ))
+
+
+@lru_cache(maxsize=1)
+def _get_http_session() -> Any:
+    """Sesión HTTP única con pool de conexiones hacia management.azure.com"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+    return session
+
+
+@lru_cache(maxsize=1)
+def _get_transport() -> Any:
+    """Transporte compartido por los clientes de Azure (la sesión no se cierra con cada cliente)"""
+    from azure.core.pipeline.transport import RequestsTransport
+    
+    return RequestsTransport(session=_get_http_session(), session_owner=False)
+
+
+@lru_cache(maxsize=None)
+def _get_clients(subscription_id: str) -> tuple:
+    """Credencial y clientes de administración de Azure reutilizados por suscripción"""
+    from azure.mgmt.resource import ResourceManagementClient
+    from azure.mgmt.compute import ComputeManagementClient
+    from azure.mgmt.network import NetworkManagementClient
+    
+    credential = _get_credential()
+    transport = _get_transport()
+    return (
+        credential,
+        ResourceManagementClient(credential, subscription_id, transport=transport),
+        ComputeManagementClient(credential, subscription_id, transport=transport),
+        NetworkManagementClient(credential, subscription_id, transport=transport)
+    )
 
 
 class AzureVMCreator:
     """Clase principal para crear máquinas virtuales en Azure"""
     
     def __init__(self, subscription_id: str, config: VMConfig):
+        _lazy_azure()
         self.subscription_id = subscription_id
         self.config = config
         self.logger = logging.getLogger("azure_vm_creator.main")
+        self._resolved_tags: Optional[Dict[str, str]] = None
         
         try:
-            self.credential = DefaultAzureCredential()
-            self.resource_client = ResourceManagementClient(self.credential, subscription_id)
-            self.compute_client = ComputeManagementClient(self.credential, subscription_id)
-            self.network_client = NetworkManagementClient(self.credential, subscription_id)
+            (self.credential, self.resource_client,
+             self.compute_client, self.network_client) = _get_clients(subscription_id)
             
             self.logger.info("Clientes de Azure inicializados correctamente")
         except Exception as e:
             self.logger.error(f"Error al inicializar clientes de Azure: {e}")
             raise
     
+    def _resolve_tags(self) -> Dict[str, str]:
+        """Calcular una sola vez los tags de la ejecución con su marca de tiempo"""
+        self._created_at = datetime.now(timezone.utc).isoformat()
+        self._resolved_tags = {**self.config.tags, 'CreatedAt': self._created_at}
+        return self._resolved_tags
+    
     def _add_tags(self, params: Dict[str, Any]) -> None:
-        """Añadir tags a los recursos"""
-        tags = self.config.get('tags', {})
-        tags['CreatedAt'] = datetime.now().isoformat()
-        if tags:
-            params['tags'] = tags
+        """Añadir tags a los recursos (el SDK no modifica el diccionario compartido)"""
+        params['tags'] = self._resolved_tags or self._resolve_tags()
     
     def create_resource_group(self, resource_group_name: str, location: str) -> Any:
         """Crear grupo de recursos con manejo de errores mejorado"""
         self.logger.info(f"Creando grupo de recursos: {resource_group_name} en {location}")
         
         try:
-            # Verificar si ya existe
-            try:
-                existing_rg = self.resource_client.resource_groups.get(resource_group_name)
+            # Verificar si ya existe (HEAD barato; el cuerpo solo se pide si existe).
+            # Un PUT sobre un grupo existente borraría sus tags o fallaría con 409 si cambia la región
+            if self.resource_client.resource_groups.check_existence(resource_group_name):
                 self.logger.info(f"Grupo de recursos {resource_group_name} ya existe")
-                return existing_rg
-            except:
-                pass  # No existe, continuamos con la creación
+                return self.resource_client.resource_groups.get(resource_group_name)
             
             rg_params = {"location": location}
             self._add_tags(rg_params)
@@ -185,12 +432,13 @@ class AzureVMCreator:
             self.logger.error(f"Error al crear grupo de recursos: {e}")
             raise
     
-    def create_virtual_network(self, resource_group_name: str, vnet_name: str, location: str) -> Any:
-        """Crear red virtual con configuración avanzada"""
+    def create_virtual_network(self, resource_group_name: str, vnet_name: str, location: str,
+                               wait: bool = True) -> Any:
+        """Crear red virtual con configuración avanzada (con wait=False devuelve el poller sin esperar)"""
         self.logger.info(f"Creando red virtual: {vnet_name}")
         
         try:
-            network_config = self.config.get('network', {})
+            network_config = self.config.network
             
             vnet_params = {
                 'location': location,
@@ -204,6 +452,9 @@ class AzureVMCreator:
                 resource_group_name, vnet_name, vnet_params
             )
             
+            if not wait:
+                return creation_result
+            
             vnet_result = creation_result.result()
             self.logger.info(f"✓ Red virtual creada: {vnet_result.name}")
             return vnet_result
@@ -217,7 +468,7 @@ class AzureVMCreator:
         self.logger.info(f"Creando subred: {subnet_name}")
         
         try:
-            network_config = self.config.get('network', {})
+            network_config = self.config.network
             
             subnet_params = {
                 'address_prefix': network_config.get('subnet_address_prefix', '10.0.0.0/24')
@@ -235,8 +486,9 @@ class AzureVMCreator:
             self.logger.error(f"Error al crear subred: {e}")
             raise
     
-    def create_public_ip(self, resource_group_name: str, ip_name: str, location: str) -> Any:
-        """Crear IP pública con configuración estática"""
+    def create_public_ip(self, resource_group_name: str, ip_name: str, location: str,
+                         wait: bool = True) -> Any:
+        """Crear IP pública con configuración estática (con wait=False devuelve el poller sin esperar)"""
         self.logger.info(f"Creando IP pública: {ip_name}")
         
         try:
@@ -251,6 +503,9 @@ class AzureVMCreator:
                 resource_group_name, ip_name, public_ip_params
             )
             
+            if not wait:
+                return creation_result
+            
             ip_result = creation_result.result()
             self.logger.info(f"✓ IP pública creada: {ip_result.name}")
             return ip_result
@@ -259,43 +514,26 @@ class AzureVMCreator:
             self.logger.error(f"Error al crear IP pública: {e}")
             raise
     
-    def create_network_security_group(self, resource_group_name: str, nsg_name: str, location: str) -> Any:
-        """Crear grupo de seguridad de red con reglas configurables"""
+    def create_network_security_group(self, resource_group_name: str, nsg_name: str, location: str,
+                                      wait: bool = True) -> Any:
+        """Crear grupo de seguridad de red con reglas configurables (con wait=False devuelve el poller sin esperar)"""
         self.logger.info(f"Creando grupo de seguridad: {nsg_name}")
         
         try:
-            security_config = self.config.get('security', {})
+            security_config = self.config.security
             ssh_port = security_config.get('ssh_port', 22)
             allowed_sources = security_config.get('allowed_ssh_sources', ['*'])
             
-            security_rules = []
-            
-            # Regla SSH
-            for i, source in enumerate(allowed_sources):
-                security_rules.append({
-                    'name': f'SSH_{i+1}',
-                    'protocol': 'Tcp',
-                    'source_port_range': '*',
-                    'destination_port_range': str(ssh_port),
-                    'source_address_prefix': source,
-                    'destination_address_prefix': '*',
-                    'access': 'Allow',
-                    'priority': 1000 + i,
-                    'direction': 'Inbound'
-                })
-            
-            # Regla para denegar todo lo demás
-            security_rules.append({
-                'name': 'DenyAllInbound',
-                'protocol': '*',
-                'source_port_range': '*',
-                'destination_port_range': '*',
-                'source_address_prefix': '*',
-                'destination_address_prefix': '*',
-                'access': 'Deny',
-                'priority': 4096,
-                'direction': 'Inbound'
-            })
+            # Reglas SSH (una por origen permitido) y regla para denegar todo lo demás
+            security_rules = [
+                {**_SSH_RULE_TEMPLATE,
+                 'name': f'SSH_{i+1}',
+                 'destination_port_range': str(ssh_port),
+                 'source_address_prefix': source,
+                 'priority': 1000 + i}
+                for i, source in enumerate(allowed_sources)
+            ]
+            security_rules.append(dict(_DENY_ALL_INBOUND_RULE))
             
             nsg_params = {
                 'location': location,
@@ -307,6 +545,9 @@ class AzureVMCreator:
                 resource_group_name, nsg_name, nsg_params
             )
             
+            if not wait:
+                return creation_result
+            
             nsg_result = creation_result.result()
             self.logger.info(f"✓ Grupo de seguridad creado: {nsg_result.name}")
             return nsg_result
@@ -350,9 +591,11 @@ class AzureVMCreator:
         """Crear máquina virtual con configuración completa"""
         self.logger.info(f"Creando máquina virtual: {vm_name}")
         
+        from azure.mgmt.compute.models import DiskCreateOption
+        
         try:
-            image_config = self.config.get('image', {})
-            disk_config = self.config.get('disk', {})
+            image_config = self.config.image
+            disk_config = self.config.disk
             
             vm_params = {
                 'location': location,
@@ -400,13 +643,33 @@ class AzureVMCreator:
             self.logger.error(f"Error al crear máquina virtual: {e}")
             raise
     
-    def get_vm_info(self, resource_group_name: str, vm_name: str) -> Dict[str, str]:
-        """Obtener información de la VM creada"""
+    def _arm_batch(self, batch_requests: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Ejecutar varias peticiones ARM en una sola llamada HTTP al endpoint /batch"""
+        token = self.credential.get_token(f"{ARM_ENDPOINT}/.default").token
+        headers = {'Authorization': f"Bearer {token}"}
+        body = {
+            'requests': [{'relativeUrl': r['url'], 'httpMethod': r['method']} for r in batch_requests]
+        }
+        
+        # Misma sesión (y conexiones TLS) que usan los clientes del SDK
+        session = _get_http_session()
+        response = session.post(
+            f"{ARM_ENDPOINT}/batch?api-version={ARM_BATCH_API_VERSION}",
+            json=body, headers=headers, timeout=60
+        )
+        # ARM puede responder 202 y dejar el resultado en la cabecera Location
+        while response.status_code == 202:
+            time.sleep(int(response.headers.get('Retry-After', 1)))
+            response = session.get(response.headers['Location'], headers=headers, timeout=60)
+        response.raise_for_status()
+        
+        return _loads(response.content).get('responses', [])
+    
+    def get_vm_info(self, vm_obj: Any, resource_group_name: str) -> Dict[str, str]:
+        """Obtener información de la VM a partir del objeto ya devuelto por su creación"""
         try:
-            vm = self.compute_client.virtual_machines.get(resource_group_name, vm_name)
-            
-            # Obtener IP pública
-            network_config = self.config.get('network', {})
+            # Solo la IP pública necesita una lectura nueva
+            network_config = self.config.network
             public_ip_name = network_config.get('public_ip_name')
             
             public_ip_address = "No asignada"
@@ -416,15 +679,60 @@ class AzureVMCreator:
                         resource_group_name, public_ip_name
                     )
                     public_ip_address = public_ip.ip_address or "Pendiente"
-                except:
-                    pass
+                except AzureError as e:
+                    self.logger.warning(f"No se pudo obtener la IP pública: {e}")
+            
+            return {
+                'vm_name': vm_obj.name,
+                'vm_id': vm_obj.vm_id,
+                'location': vm_obj.location,
+                'vm_size': vm_obj.hardware_profile.vm_size,
+                'provisioning_state': vm_obj.provisioning_state,
+                'public_ip': public_ip_address,
+                'admin_username': self.config.get('admin_username')
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error al obtener información de la VM: {e}")
+            return {}
+    
+    def refresh_vm_info(self, resource_group_name: str, vm_name: str) -> Dict[str, str]:
+        """Releer la información de la VM desde Azure (VM e IP pública en una sola petición /batch)"""
+        try:
+            rg_path = f"/subscriptions/{self.subscription_id}/resourceGroups/{resource_group_name}/providers"
+            batch_requests = [{
+                'url': f"{rg_path}/Microsoft.Compute/virtualMachines/{vm_name}?api-version={COMPUTE_API_VERSION}",
+                'method': 'GET'
+            }]
+            
+            # Obtener IP pública
+            network_config = self.config.network
+            public_ip_name = network_config.get('public_ip_name')
+            if public_ip_name:
+                batch_requests.append({
+                    'url': f"{rg_path}/Microsoft.Network/publicIPAddresses/{public_ip_name}"
+                           f"?api-version={NETWORK_API_VERSION}",
+                    'method': 'GET'
+                })
+            
+            responses = self._arm_batch(batch_requests)
+            
+            vm_response = responses[0]
+            if not 200 <= vm_response.get('httpStatusCode', 0) < 300:
+                raise AzureError(f"Respuesta {vm_response.get('httpStatusCode')}: {vm_response.get('content')}")
+            vm = vm_response['content']
+            vm_properties = vm.get('properties', {})
+            
+            public_ip_address = "No asignada"
+            if public_ip_name and len(responses) > 1 and 200 <= responses[1].get('httpStatusCode', 0) < 300:
+                public_ip_address = responses[1]['content'].get('properties', {}).get('ipAddress') or "Pendiente"
             
             return {
-                'vm_name': vm.name,
-                'vm_id': vm.vm_id,
-                'location': vm.location,
-                'vm_size': vm.hardware_profile.vm_size,
-                'provisioning_state': vm.provisioning_state,
+                'vm_name': vm.get('name'),
+                'vm_id': vm_properties.get('vmId'),
+                'location': vm.get('location'),
+                'vm_size': vm_properties.get('hardwareProfile', {}).get('vmSize'),
+                'provisioning_state': vm_properties.get('provisioningState'),
                 'public_ip': public_ip_address,
                 'admin_username': self.config.get('admin_username')
             }
@@ -433,6 +741,18 @@ class AzureVMCreator:
             self.logger.error(f"Error al obtener información de la VM: {e}")
             return {}
     
+    def _await_all(self, pollers: Dict[str, 'LROPoller']) -> List[Any]:
+        """Esperar a varias operaciones de larga duración ya lanzadas (recurso -> poller)"""
+        # Las operaciones avanzan en Azure a la vez: esperar una tras otra tarda lo que la más lenta
+        results = []
+        for resource, poller in pollers.items():
+            try:
+                results.append(poller.result())
+            except AzureError as e:
+                self.logger.error(f"Error al crear {resource}: {e}")
+                raise
+        return results
+    
     def create_complete_vm(self) -> Optional[Any]:
         """Crear una VM completa con todos los recursos necesarios"""
         try:
@@ -442,39 +762,51 @@ class AzureVMCreator:
             admin_username = self.config.get('admin_username')
             admin_password = self.config.get('admin_password')
             
-            network_config = self.config.get('network', {})
+            network_config = self.config.network
             
             self.logger.info("=== Iniciando creación de infraestructura Azure ===")
             
+            # Misma marca CreatedAt para todos los recursos de esta ejecución
+            self._resolve_tags()
+            
             # Crear grupo de recursos
             self.create_resource_group(resource_group, location)
             
-            # Crear red virtual
-            self.create_virtual_network(
+            # Red virtual, IP pública y grupo de seguridad solo dependen del grupo de recursos:
+            # se lanzan las tres operaciones y se espera a todas (el tiempo total es el del más lento)
+            vnet_poller = self.create_virtual_network(
                 resource_group, 
                 network_config.get('vnet_name'), 
-                location
+                location,
+                wait=False
             )
-            
-            # Crear subred
-            subnet = self.create_subnet(
+            public_ip_poller = self.create_public_ip(
                 resource_group, 
-                network_config.get('vnet_name'), 
-                network_config.get('subnet_name')
+                network_config.get('public_ip_name'), 
+                location,
+                wait=False
             )
-            
-            # Crear IP pública
-            public_ip = self.create_public_ip(
+            nsg_poller = self.create_network_security_group(
                 resource_group, 
-                network_config.get('public_ip_name'), 
-                location
+                network_config.get('nsg_name'), 
+                location,
+                wait=False
             )
             
-            # Crear grupo de seguridad
-            nsg = self.create_network_security_group(
+            vnet, public_ip, nsg = self._await_all({
+                'red virtual': vnet_poller,
+                'IP pública': public_ip_poller,
+                'grupo de seguridad': nsg_poller
+            })
+            self.logger.info(f"✓ Red virtual creada: {vnet.name}")
+            self.logger.info(f"✓ IP pública creada: {public_ip.name}")
+            self.logger.info(f"✓ Grupo de seguridad creado: {nsg.name}")
+            
+            # Crear subred (requiere la red virtual)
+            subnet = self.create_subnet(
                 resource_group, 
-                network_config.get('nsg_name'), 
-                location
+                network_config.get('vnet_name'), 
+                network_config.get('subnet_name')
             )
             
             # Crear interfaz de red
@@ -494,25 +826,61 @@ class AzureVMCreator:
             )
             
             # Obtener información final
-            vm_info = self.get_vm_info(resource_group, vm_name)
+            vm_info = self.get_vm_info(vm, resource_group)
             
             self.logger.info("=== Creación completada exitosamente ===")
-            self.logger.info(f"VM Name: {vm_info.get('vm_name')}")
-            self.logger.info(f"VM ID: {vm_info.get('vm_id')}")
-            self.logger.info(f"Location: {vm_info.get('location')}")
-            self.logger.info(f"Size: {vm_info.get('vm_size')}")
-            self.logger.info(f"Public IP: {vm_info.get('public_ip')}")
-            self.logger.info(f"Admin User: {vm_info.get('admin_username')}")
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(f"VM Name: {vm_info.get('vm_name')}")
+                self.logger.info(f"VM ID: {vm_info.get('vm_id')}")
+                self.logger.info(f"Location: {vm_info.get('location')}")
+                self.logger.info(f"Size: {vm_info.get('vm_size')}")
+                self.logger.info(f"Public IP: {vm_info.get('public_ip')}")
+                self.logger.info(f"Admin User: {vm_info.get('admin_username')}")
             
             return vm
             
         except Exception as e:
             self.logger.error(f"Error en la creación de la máquina virtual: {str(e)}")
             return None
+    
+    @classmethod
+    def create_many(cls, subscription_id: str, configs: List[VMConfig],
+                    max_workers: int = 16) -> List[Tuple[VMConfig, Optional[Any]]]:
+        """Crear varias VMs independientes en paralelo.
+        
+        Devuelve pares (config, VM o None si falló) en el orden de `configs`. Cada configuración debe
+        usar nombres propios de VM, red virtual, subred, IP pública, NSG y NIC (o grupos de recursos
+        distintos): con nombres compartidos las creaciones concurrentes se pisan entre sí.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # Todas las instancias comparten credencial y clientes vía _get_clients
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(cls(subscription_id, config).create_complete_vm)
+                for config in configs
+            ]
+            return [(config, future.result()) for config, future in zip(configs, futures)]
 
 
-def parse_arguments() -> argparse.Namespace:
-    """Parsear argumentos de línea de comandos"""
+# Valor por defecto de cada argumento; también forma el Namespace del modo interactivo
+_ARG_DEFAULTS = {
+    'config': None,
+    'subscription_id': None,
+    'vm_name': None,
+    'resource_group': None,
+    'location': None,
+    'vm_size': None,
+    'admin_user': None,
+    'admin_password': None,
+    'log_level': 'INFO',
+    'dry_run': False,
+    'generate_config': None
+}
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Construir el parser de argumentos (main() no lo llama cuando no hay argumentos)"""
     parser = argparse.ArgumentParser(
         description="Azure VM Creator - Herramienta profesional para crear VMs en Azure",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -524,7 +892,7 @@ Ejemplos de uso:
         """
     )
     
-    parser.add_argument('--version', action='version', version='Azure VM Creator 2.0.0')
+    parser.add_argument('--version', action='version', version=f'Azure VM Creator {__version__}')
     
     # Configuración básica
     parser.add_argument('--config', '-c', 
@@ -558,37 +926,38 @@ Ejemplos de uso:
     parser.add_argument('--generate-config', 
                        help='Generar archivo de configuración de ejemplo')
     
-    return parser.parse_args()
+    parser.set_defaults(**_ARG_DEFAULTS)
+    return parser
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parsear argumentos de línea de comandos"""
+    return _build_parser().parse_args(argv)
 
 
 def generate_config_file(filename: str) -> None:
     """Generar archivo de configuración de ejemplo"""
     config = VMConfig()
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(config.config, f, indent=2, ensure_ascii=False)
+    Path(filename).write_bytes(_dumps_pretty(config.config))
     
     print(f"✓ Archivo de configuración generado: {filename}")
     print(f"  Edita este archivo para personalizar tu configuración antes de ejecutar el script.")
 
 
-def print_banner():
-    """Mostrar banner profesional"""
-    banner = """
+# Textos fijos de la interfaz, construidos una vez y escritos de una sola vez
+_BANNER_TEXT = """
 ╔══════════════════════════════════════════════════════════════════════╗
-║                    🚀 AZURE VM CREATOR v2.0.0 🚀                     ║
+║                    🚀 AZURE VM CREATOR v{version} 🚀                     ║
 ║                                                                      ║
 ║        Herramienta para crear VMs en Azure                           ║
 ║        Desarrollado por: Jennifer                                    ║
 ║        Fecha: 6 de junio de 2025                                     ║
 ╚══════════════════════════════════════════════════════════════════════╝
-    """
-    print(banner)
 
+""".format(version=__version__)
 
-def show_menu() -> int:
-    """Mostrar menú principal y obtener selección del usuario"""
-    menu_options = """
+_MENU_TEXT = """
 ┌─────────────────── MENÚ PRINCIPAL ───────────────────┐
 │                                                      │
 │  1. 🆕 Crear nueva máquina virtual                   │
@@ -600,40 +969,134 @@ def show_menu() -> int:
 │  7. 🚪 Salir                                         │
 │                                                      │
 └──────────────────────────────────────────────────────┘
-    """
-    
-    print(menu_options)
+
+"""
+
+_EXAMPLES_TEXT = """
+┌─────────────────── EJEMPLOS DE USO ──────────────────┐
+│                                                      │
+│ 📋 Uso básico desde línea de comandos:               │
+│                                                      │
+│   python create_vm.py --vm-name servidor-web \\      │
+│                      --location "West Europe"        │
+│                                                      │
+│ 📋 Con configuración personalizada:                  │
+│                                                      │
+│   python create_vm.py --config mi-config.json \\     │
+│                      --log-level DEBUG               │
+│                                                      │
+│ 📋 Vista previa sin crear recursos:                  │
+│                                                      │
+│   python create_vm.py --dry-run \\                   │
+│                      --vm-name test-vm               │
+│                                                      │
+│ 📋 Generar configuración de ejemplo:                 │
+│                                                      │
+│   python create_vm.py --generate-config config.json │
+│                                                      │
+└──────────────────────────────────────────────────────┘
+
+"""
+
+_HELP_TEXT = """
+┌─────────────────── AYUDA Y DOCUMENTACIÓN ────────────────────┐
+│                                                              │
+│ 🔧 CONFIGURACIÓN INICIAL:                                    │
+│                                                              │
+│   1. Instalar dependencias:                                  │
+│      pip install -r requirements.txt                         │
+│                                                              │
+│   2. Autenticarse en Azure:                                  │
+│      az login                                                │
+│                                                              │
+│   3. Configurar Subscription ID:                             │
+│      export AZURE_SUBSCRIPTION_ID="tu-subscription-id"       │
+│                                                              │
+│ 📋 CARACTERÍSTICAS:                                          │
+│                                                              │
+│   • Creación automatizada de todos los recursos              │
+│   • Configuración de seguridad por defecto                   │
+│   • Logging detallado y manejo de errores                    │
+│   • Soporte para configuración externa (JSON)                │
+│   • Modo dry-run para vista previa                           │
+│   • Tags automáticos para organización                       │
+│                                                              │
+│ 🔗 RECURSOS CREADOS:                                         │
+│                                                              │
+│   • Grupo de recursos                                        │
+│   • Red virtual y subred                                     │
+│   • IP pública                                               │
+│   • Grupo de seguridad de red                                │
+│   • Interfaz de red                                          │
+│   • Máquina virtual                                          │
+│                                                              │
+└──────────────────────────────────────────────────────────────┘
+
+"""
+
+
+# Iniciales aceptadas como confirmación (s, si, sí, y, yes...)
+_YES = frozenset({'s', 'y'})
+
+
+def _write(text: str) -> None:
+    """Escribir un bloque de texto en una sola llamada y vaciar el buffer"""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def _read_line(prompt: str) -> str:
+    """Leer una línea de stdin sin pasar por input()"""
+    _write(prompt)
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip('\n')
+
+
+def print_banner():
+    """Mostrar banner profesional"""
+    _write(_BANNER_TEXT)
+
+
+def show_menu() -> int:
+    """Mostrar menú principal y obtener selección del usuario"""
+    _write(_MENU_TEXT)
     
     while True:
         try:
-            choice = int(input("🔸 Seleccione una opción (1-7): "))
+            choice = int(_read_line("🔸 Seleccione una opción (1-7): "))
             if 1 <= choice <= 7:
                 return choice
             else:
-                print("❌ Por favor, seleccione un número entre 1 y 7.")
+                _write("❌ Por favor, seleccione un número entre 1 y 7.\n")
         except ValueError:
-            print("❌ Por favor, ingrese un número válido.")
+            _write("❌ Por favor, ingrese un número válido.\n")
 
 
 def interactive_vm_creation() -> Dict[str, Any]:
-    """Creación interactiva de VM con validaciones"""
+    """Creación interactiva de VM con validaciones
+    
+    Devuelve solo los valores que difieren de la configuración por defecto; lo que el
+    usuario deja en blanco (ubicación, tamaño, usuario) se toma de _DEFAULT_CONFIG.
+    """
     print("\n" + "="*60)
     print("🔧 CONFIGURACIÓN INTERACTIVA DE MÁQUINA VIRTUAL")
     print("="*60)
     
-    config = {}
+    overrides = {}
     
     # Nombre de la VM
     while True:
         vm_name = input("\n📝 Nombre de la VM (ej: mi-servidor-web): ").strip()
-        if vm_name and len(vm_name) <= 64 and vm_name.replace('-', '').replace('_', '').isalnum():
-            config['vm_name'] = vm_name
+        if _VM_NAME_RE.fullmatch(vm_name):
+            overrides['vm_name'] = vm_name
             break
         print("❌ Nombre inválido. Use 1-64 caracteres alfanuméricos, guiones o guiones bajos.")
     
     # Grupo de recursos
     rg_name = input("\n📦 Grupo de recursos (Enter para usar 'rg-{vm_name}'): ").strip()
-    config['resource_group'] = rg_name if rg_name else f"rg-{vm_name}"
+    overrides['resource_group'] = rg_name if rg_name else f"rg-{vm_name}"
     
     # Ubicación
     locations = [
@@ -646,9 +1109,12 @@ def interactive_vm_creation() -> Dict[str, Any]:
     
     while True:
         try:
-            loc_choice = int(input("\n🔸 Seleccione ubicación (1-8, Enter para East US): ") or "1")
+            loc_input = input("\n🔸 Seleccione ubicación (1-8, Enter para East US): ").strip()
+            if not loc_input:
+                break
+            loc_choice = int(loc_input)
             if 1 <= loc_choice <= len(locations):
-                config['location'] = locations[loc_choice - 1]
+                overrides['location'] = locations[loc_choice - 1]
                 break
         except ValueError:
             pass
@@ -668,9 +1134,12 @@ def interactive_vm_creation() -> Dict[str, Any]:
     
     while True:
         try:
-            size_choice = int(input("\n🔸 Seleccione tamaño (1-4, Enter para Standard_B2s): ") or "2")
+            size_input = input("\n🔸 Seleccione tamaño (1-4, Enter para Standard_B2s): ").strip()
+            if not size_input:
+                break
+            size_choice = int(size_input)
             if 1 <= size_choice <= len(vm_sizes):
-                config['vm_size'] = vm_sizes[size_choice - 1][0]
+                overrides['vm_size'] = vm_sizes[size_choice - 1][0]
                 break
         except ValueError:
             pass
@@ -678,85 +1147,97 @@ def interactive_vm_creation() -> Dict[str, Any]:
     
     # Usuario administrador
     admin_user = input(f"\n👤 Usuario administrador (Enter para 'azureuser'): ").strip()
-    config['admin_username'] = admin_user if admin_user else 'azureuser'
+    if admin_user:
+        overrides['admin_username'] = admin_user
     
     # Contraseña
+    from getpass import getpass
     while True:
-        password = getpass.getpass("\n🔐 Contraseña del administrador: ")
-        if len(password) >= 8:
-            config['admin_password'] = password
+        password = getpass("\n🔐 Contraseña del administrador: ")
+        if _PASSWORD_POLICY_RE.match(password):
+            overrides['admin_password'] = password
             break
-        print("❌ La contraseña debe tener al menos 8 caracteres.")
+        print("❌ La contraseña debe tener 8-72 caracteres y al menos 3 de: minúsculas, mayúsculas, dígitos y símbolos.")
     
-    return config
+    return overrides
 
 
 def show_examples():
     """Mostrar ejemplos de uso del script"""
-    examples = """
-┌─────────────────── EJEMPLOS DE USO ──────────────────┐
-│                                                      │
-│ 📋 Uso básico desde línea de comandos:               │
-│                                                      │
-│   python create_vm.py --vm-name servidor-web \\      │
-│                      --location "West Europe"        │
-│                                                      │
-│ 📋 Con configuración personalizada:                  │
-│                                                      │
-│   python create_vm.py --config mi-config.json \\     │
-│                      --log-level DEBUG               │
-│                                                      │
-│ 📋 Vista previa sin crear recursos:                  │
-│                                                      │
-│   python create_vm.py --dry-run \\                   │
-│                      --vm-name test-vm               │
-│                                                      │
-│ 📋 Generar configuración de ejemplo:                 │
-│                                                      │
-│   python create_vm.py --generate-config config.json │
-│                                                      │
-└──────────────────────────────────────────────────────┘
-    """
-    print(examples)
+    _write(_EXAMPLES_TEXT)
 
 
 def show_help():
     """Mostrar ayuda y documentación"""
-    help_text = """
-┌─────────────────── AYUDA Y DOCUMENTACIÓN ────────────────────┐
-│                                                              │
-│ 🔧 CONFIGURACIÓN INICIAL:                                    │
-│                                                              │
-│   1. Instalar dependencias:                                  │
-│      pip install -r requirements.txt                         │
-│                                                              │
-│   2. Autenticarse en Azure:                                  │
-│      az login                                                │
-│                                                              │
-│   3. Configurar Subscription ID:                             │
-│      export AZURE_SUBSCRIPTION_ID="tu-subscription-id"       │
-│                                                              │
-│ 📋 CARACTERÍSTICAS:                                          │
-│                                                              │
-│   • Creación automatizada de todos los recursos              │
-│   • Configuración de seguridad por defecto                   │
-│   • Logging detallado y manejo de errores                    │
-│   • Soporte para configuración externa (JSON)                │
-│   • Modo dry-run para vista previa                           │
-│   • Tags automáticos para organización                       │
-│                                                              │
-│ 🔗 RECURSOS CREADOS:                                         │
-│                                                              │
-│   • Grupo de recursos                                        │
-│   • Red virtual y subred                                     │
-│   • IP pública                                               │
-│   • Grupo de seguridad de red                                │
-│   • Interfaz de red                                          │
-│   • Máquina virtual                                          │
-│                                                              │
-└──────────────────────────────────────────────────────────────┘
-    """
-    print(help_text)
+    _write(_HELP_TEXT)
+
+
+# Resultados del menú interactivo que main() sabe ejecutar
+MENU_CREATE_DEFAULT = object()
+MENU_DRY_RUN = object()
+
+
+class MenuCreateCustom(NamedTuple):
+    """Resultado del menú para crear una VM con los valores introducidos por el usuario"""
+    overrides: Dict[str, Any]
+
+
+def _menu_create_default():
+    """Opción 1: crear nueva VM con configuración por defecto"""
+    print("\n🚀 Iniciando creación de VM con configuración por defecto...")
+    return MENU_CREATE_DEFAULT
+
+
+def _menu_create_custom():
+    """Opción 2: crear VM con configuración personalizada"""
+    print("\n🔧 Iniciando configuración personalizada...")
+    custom_config = interactive_vm_creation()
+    return MenuCreateCustom(custom_config)
+
+
+def _menu_generate_config():
+    """Opción 3: generar archivo de configuración"""
+    filename = input("\n📄 Nombre del archivo de configuración (config.json): ").strip()
+    if not filename:
+        filename = "config.json"
+    generate_config_file(filename)
+    input("\n✅ Presione Enter para continuar...")
+
+
+def _menu_dry_run():
+    """Opción 4: vista previa (dry-run)"""
+    print("\n🔍 Modo vista previa activado...")
+    return MENU_DRY_RUN
+
+
+def _menu_examples():
+    """Opción 5: mostrar ejemplos"""
+    show_examples()
+    input("\n📚 Presione Enter para continuar...")
+
+
+def _menu_help():
+    """Opción 6: mostrar ayuda"""
+    show_help()
+    input("\n❓ Presione Enter para continuar...")
+
+
+def _menu_exit():
+    """Opción 7: salir"""
+    print("\n👋 ¡Gracias por usar Azure VM Creator!")
+    sys.exit(0)
+
+
+# Acción de cada opción del menú; las que devuelven None vuelven a mostrar el menú
+_MENU_ACTIONS = {
+    1: _menu_create_default,
+    2: _menu_create_custom,
+    3: _menu_generate_config,
+    4: _menu_dry_run,
+    5: _menu_examples,
+    6: _menu_help,
+    7: _menu_exit
+}
 
 
 def interactive_menu_mode():
@@ -764,77 +1245,53 @@ def interactive_menu_mode():
     print_banner()
     
     while True:
-        choice = show_menu()
-        
-        if choice == 1:
-            # Crear nueva VM con configuración por defecto
-            print("\n🚀 Iniciando creación de VM con configuración por defecto...")
-            return 'create_default'
-            
-        elif choice == 2:
-            # Crear VM con configuración personalizada
-            print("\n🔧 Iniciando configuración personalizada...")
-            custom_config = interactive_vm_creation()
-            return 'create_custom', custom_config
-            
-        elif choice == 3:
-            # Generar archivo de configuración
-            filename = input("\n📄 Nombre del archivo de configuración (config.json): ").strip()
-            if not filename:
-                filename = "config.json"
-            generate_config_file(filename)
-            input("\n✅ Presione Enter para continuar...")
-            
-        elif choice == 4:
-            # Vista previa (dry-run)
-            print("\n🔍 Modo vista previa activado...")
-            return 'dry_run'
-            
-        elif choice == 5:
-            # Mostrar ejemplos
-            show_examples()
-            input("\n📚 Presione Enter para continuar...")
-            
-        elif choice == 6:
-            # Mostrar ayuda
-            show_help()
-            input("\n❓ Presione Enter para continuar...")
-            
-        elif choice == 7:
-            # Salir
-            print("\n👋 ¡Gracias por usar Azure VM Creator!")
-            sys.exit(0)
+        handler = _MENU_ACTIONS.get(show_menu())
+        result = handler() if handler else None
+        if result is not None:
+            return result
+
+
+def _prompt_password() -> str:
+    """Pedir la contraseña del administrador; termina el programa si se deja vacía"""
+    from getpass import getpass
+    
+    password = getpass("🔐 Ingrese la contraseña del administrador: ")
+    if not password:
+        sys.stderr.write("❌ Contraseña requerida\n")
+        sys.exit(1)
+    return password
 
 
 def main():
     """Función principal"""
-    args = parse_arguments()
+    # Sin argumentos se va directo al menú interactivo sin construir el parser
+    interactive = len(sys.argv) == 1
+    args = argparse.Namespace(**_ARG_DEFAULTS) if interactive else parse_arguments()
+    
+    # Configurar logging (una sola vez por ejecución)
+    logger = setup_logging(args.log_level)
     
     # Si no hay argumentos, mostrar menú interactivo
-    if len(sys.argv) == 1:
+    if interactive:
         menu_result = interactive_menu_mode()
         
-        if menu_result == 'create_default':
-            # Usar configuración por defecto
-            config = VMConfig()
+        # Todas las opciones del menú parten de la configuración por defecto
+        config = VMConfig()
+        cfg = config.config
+        
+        if menu_result is MENU_CREATE_DEFAULT:
             # Solicitar contraseña
-            password = getpass.getpass("🔐 Ingrese la contraseña del administrador: ")
-            if not password:
-                print("❌ Contraseña requerida")
-                sys.exit(1)
-            config.config['admin_password'] = password
-            
-        elif isinstance(menu_result, tuple) and menu_result[0] == 'create_custom':
-            # Usar configuración personalizada del menú
-            config = VMConfig()
-            config.config.update(menu_result[1])
-            
-        elif menu_result == 'dry_run':
+            cfg['admin_password'] = _prompt_password()
+            
+        elif isinstance(menu_result, MenuCreateCustom):
+            # Solo trae los valores cambiados por el usuario (más la contraseña)
+            assert set(menu_result.overrides) <= set(cfg) | {'admin_password'}
+            cfg.update(menu_result.overrides)
+            
+        elif menu_result is MENU_DRY_RUN:
             # Modo dry-run con configuración por defecto
-            config = VMConfig()
-            logger = setup_logging('INFO')
             logger.info("=== MODO DRY-RUN - Configuración por defecto ===")
-            print(json.dumps(config.config, indent=2, ensure_ascii=False))
+            _write(_dumps_pretty(cfg).decode('utf-8') + '\n')
             return
             
     else:
@@ -845,40 +1302,33 @@ def main():
         
         # Cargar configuración
         config = VMConfig(args.config)
+        cfg = config.config
         
         # Aplicar argumentos de línea de comandos
         if args.vm_name:
-            config.config['vm_name'] = args.vm_name
+            cfg['vm_name'] = args.vm_name
         if args.resource_group:
-            config.config['resource_group'] = args.resource_group
+            cfg['resource_group'] = args.resource_group
         if args.location:
-            config.config['location'] = args.location
+            cfg['location'] = args.location
         if args.vm_size:
-            config.config['vm_size'] = args.vm_size
+            cfg['vm_size'] = args.vm_size
         if args.admin_user:
-            config.config['admin_username'] = args.admin_user
+            cfg['admin_username'] = args.admin_user
         
-        # Solicitar contraseña si no se proporcionó
+        # Solicitar contraseña si no se proporcionó (ni en argumentos ni en el archivo)
         if args.admin_password:
-            config.config['admin_password'] = args.admin_password
-        elif not config.get('admin_password'):
-            password = getpass.getpass("🔐 Ingrese la contraseña del administrador: ")
-            if not password:
-                print("❌ Contraseña requerida")
-                sys.exit(1)
-            config.config['admin_password'] = password
+            cfg['admin_password'] = args.admin_password
+        elif not cfg.get('admin_password'):
+            cfg['admin_password'] = _prompt_password()
         
         # Modo dry-run
         if args.dry_run:
-            logger = setup_logging(args.log_level)
             logger.info("=== MODO DRY-RUN - Configuración a usar ===")
-            print(json.dumps(config.config, indent=2, ensure_ascii=False))
+            _write(_dumps_pretty(cfg).decode('utf-8') + '\n')
             return
     
-    # Configurar logging
-    log_level = getattr(args, 'log_level', 'INFO')
-    logger = setup_logging(log_level)
-    logger.info("=== Azure VM Creator v2.0.0 ===")
+    logger.info(f"=== Azure VM Creator v{__version__} ===")
     
     try:
         # Validar configuración
@@ -887,29 +1337,37 @@ def main():
             sys.exit(1)
         
         # Obtener subscription ID
-        subscription_id = getattr(args, 'subscription_id', None) or os.environ.get('AZURE_SUBSCRIPTION_ID')
+        subscription_id = args.subscription_id or os.getenv('AZURE_SUBSCRIPTION_ID')
         if not subscription_id:
-            print("\n❌ Azure Subscription ID requerido")
-            print("💡 Opciones:")
-            print("   1. Use --subscription-id en línea de comandos")
-            print("   2. Configure: export AZURE_SUBSCRIPTION_ID='tu-subscription-id'")
-            print("   3. Use: az account show --query id --output tsv")
+            _write(
+                "\n❌ Azure Subscription ID requerido\n"
+                "💡 Opciones:\n"
+                "   1. Use --subscription-id en línea de comandos\n"
+                "   2. Configure: export AZURE_SUBSCRIPTION_ID='tu-subscription-id'\n"
+                "   3. Use: az account show --query id --output tsv\n"
+            )
             sys.exit(1)
         
         logger.info(f"📋 Subscription ID: {subscription_id}")
         
-        # Mostrar resumen de configuración
-        print(f"\n📋 RESUMEN DE CONFIGURACIÓN:")
-        print(f"   🏷️  VM Name: {config.get('vm_name')}")
-        print(f"   📦 Resource Group: {config.get('resource_group')}")
-        print(f"   🌍 Location: {config.get('location')}")
-        print(f"   💻 VM Size: {config.get('vm_size')}")
-        print(f"   👤 Admin User: {config.get('admin_username')}")
+        # Mostrar resumen de configuración (los campos requeridos ya están validados)
+        vm_name, resource_group, location, vm_size, admin_user = (
+            cfg['vm_name'], cfg['resource_group'], cfg['location'],
+            cfg.get('vm_size'), cfg['admin_username']
+        )
+        _write(
+            f"\n📋 RESUMEN DE CONFIGURACIÓN:\n"
+            f"   🏷️  VM Name: {vm_name}\n"
+            f"   📦 Resource Group: {resource_group}\n"
+            f"   🌍 Location: {location}\n"
+            f"   💻 VM Size: {vm_size}\n"
+            f"   👤 Admin User: {admin_user}\n"
+        )
         
         # Confirmación para proceder
-        if len(sys.argv) == 1:  # Solo en modo interactivo
-            confirm = input(f"\n🤔 ¿Proceder con la creación? (s/N): ").strip().lower()
-            if confirm not in ['s', 'si', 'sí', 'y', 'yes']:
+        if interactive:  # Solo en modo interactivo
+            confirm = (input(f"\n🤔 ¿Proceder con la creación? (s/N): ").strip()[:1] or 'n').lower()
+            if confirm not in _YES:
                 print("⏹️  Operación cancelada por el usuario.")
                 sys.exit(0)
         